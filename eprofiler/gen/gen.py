@@ -1,14 +1,20 @@
 import argparse
 import copy
+import functools
 import hashlib
 import json
 import os
+import signal
+import socketserver
 import sys
+import threading
 from itertools import chain
 from typing import Union
 
 from lark import Lark, Transformer, Tree
 
+from gen_client import default_socket_path, gen_version, is_daemon_running
+
 # Hacked together parser for C++ symbols 
 # This is not a complete parser only written to parse the symbols currently produced by eprofiler
 
@@ -579,27 +585,91 @@ class SymbolsTransformer(Transformer):
         """
         return self.remove_nones(items)
 
-if __name__ == "__main__":
-    # Setup argument parser
-    parser = argparse.ArgumentParser(
-                    prog='gen.py',
-                    description='Generates a C++ file with the unresolved symbols from a static library mapping to unique ids.'
-    )
 
-    parser.add_argument('output_fn', type=str, help='Output file name')
-    parser.add_argument('static_lib_fn', type=str, help='Static library file name')
+# Parse trees are cached by demangled symbol and shared between requests when running as a daemon,
+# bounded so a long-lived daemon doesn't grow with every symbol it has ever seen
+SYMBOL_CACHE_SIZE = 65536
+symbol_parser_lock = threading.Lock()
 
-    # Parse and unpack arguments
-    args = parser.parse_args()
-    output_fn = args.output_fn
-    static_lib_fn = args.static_lib_fn
+@functools.lru_cache(maxsize=SYMBOL_CACHE_SIZE)
+def parse_symbol_tree(line : str) -> Tree:
+    """
+    Parses a demangled symbol, the Lark parser is shared between threads so parsing is serialised.
+
+    Parameters
+        line : str -> Demangled symbol
+    Returns
+        Tree -> The Lark parse tree
+    """
+    with symbol_parser_lock:
+        return symbol_parser.parse(line)
+
+def parse_symbol(line : str) -> CXXType:
+    """
+    Parses and transforms a demangled symbol, reusing cached parse trees.
+    Transformed symbols are modified during generation so only the tree is cached.
+
+    Parameters
+        line : str -> Demangled symbol
+    Returns
+        CXXType -> The parsed symbol
+    """
+    return SymbolsTransformer().transform(parse_symbol_tree(line))
+
+def validate_span_budgets(span_budgets) -> str:
+    """
+    Validates a loaded budgets config, budgets are emitted into the generated C++ so anything
+    that isn't a duration tick count is rejected.
+
+    Parameters
+        span_budgets -> Loaded budgets JSON
+    Returns
+        str -> Description of the first problem, or None if the config is valid
+    """
+    if not isinstance(span_budgets, dict):
+        return 'must map profiler names to span budgets'
+
+    for profiler_name, budgets in span_budgets.items():
+        if not isinstance(budgets, dict):
+            return f'budgets of profiler {profiler_name} must map "<start>-><end>" spans to budgets'
+        for span_name, budget in budgets.items():
+            if type(budget) != int or budget < 0:
+                return f'budget of {profiler_name}:{span_name} must be a non-negative integer number of duration ticks, got {budget!r}'
 
-    print(f'Generating file: {output_fn} from static library: {static_lib_fn}')
+    return None
+
+def generate(output_fn : str, static_lib_fn : str, budgets_fn : str = None, log=print) -> int:
+    """
+    Generates a C++ file and .json ID map from the unresolved eprofiler symbols of a static library.
+
+    Parameters
+        output_fn : str -> Output file name
+        static_lib_fn : str -> Static library file name
+        budgets_fn : str -> Optional JSON file with span budgets
+        log : callable -> Function used to report progress and errors
+    Returns
+        int -> Exit code, 0 on success
+    """
+    log(f'Generating file: {output_fn} from static library: {static_lib_fn}')
 
     # Validate file path
     if not os.path.exists(static_lib_fn):
-        print(f'Error: {static_lib_fn} does not exist')
-        sys.exit(1)
+        log(f'Error: {static_lib_fn} does not exist')
+        return 1
+
+    # Load span budgets keyed by profiler name
+    span_budgets = {}
+    if budgets_fn is not None:
+        if not os.path.exists(budgets_fn):
+            log(f'Error: {budgets_fn} does not exist')
+            return 1
+        with open(budgets_fn, 'r') as f:
+            span_budgets = json.load(f)
+
+        budgets_error = validate_span_budgets(span_budgets)
+        if budgets_error is not None:
+            log(f'Error: {budgets_fn}: {budgets_error}')
+            return 1
 
 
     # Dump unresolved symbols from static library
@@ -625,19 +695,19 @@ if __name__ == "__main__":
 
             line = line[line_start_idx+2:].strip()
 
-            # Parse and transform line using Lark parser and transformer
-            symbol = symbol_parser.parse(line)
-            parsed_symbol = SymbolsTransformer().transform(symbol)
+            # Parse and transform line using the cached Lark parser and transformer
+            parsed_symbol = parse_symbol(line)
 
             if parsed_symbol.name != 'eprofiler':
                 # Skip symbols that are not in eprofiler namespace
                 continue
 
             is_profiler = False
+            profiler_name = None
             hashtable_parent_uniquetype = parsed_symbol.parsed_child.template_args[0]
 
-            # Check if hashtable is a profiler and convert the profiler name to a string literal
-            if hashtable_parent_uniquetype.name == 'eprofiler' and hashtable_parent_uniquetype.parsed_child.name == 'EProfiler':
+            # Check if hashtable is a profiler (its span table or a counter) and convert the profiler name to a string literal
+            if hashtable_parent_uniquetype.name == 'eprofiler' and hashtable_parent_uniquetype.parsed_child.name in ('EProfiler', 'EProfilerSpans', 'ECounter'):
                 is_profiler = True
                 # Extract the profiler name and tag name from the parsed symbol
                 profiler_name_literal = parsed_symbol.parsed_child.template_args[0].parsed_child.template_args[0]
@@ -671,7 +741,10 @@ if __name__ == "__main__":
                     'key_type': keytype,
                     'value_type': valuetype,
                     'gen_value_store': False,
-                    'is_profiler': is_profiler
+                    'is_profiler': is_profiler,
+                    'profiler_name': profiler_name,
+                    'is_span_table': is_profiler and hashtable_parent_uniquetype.parsed_child.name == 'EProfilerSpans',
+                    'is_counter': is_profiler and hashtable_parent_uniquetype.parsed_child.name == 'ECounter'
                 }
                         
             # check if parsed symbol is value_store
@@ -701,10 +774,24 @@ if __name__ == "__main__":
     with open(f'{json_fn}', 'w') as outf:
         outf.write(json.dumps(hash_info, indent=4))
 
-    print(hash_info)
+    log(hash_info)
+
+    # Warn about budgets for spans which are never ended with end_span
+    for profiler_name, budgets in span_budgets.items():
+        span_tables = [ x for x in registered_hashtables.values() if x['is_span_table'] and x['profiler_name'] == profiler_name ]
+
+        # Budgets are raw ticks, profilers sharing a name but not a duration type would interpret them in different units
+        duration_types = { x['value_type'] for x in span_tables }
+        if len(duration_types) > 1:
+            log(f'Error: budgets for profiler {profiler_name} are ambiguous, it is used with multiple duration types: {", ".join(sorted(duration_types))}')
+            return 1
+
+        for span_name in budgets:
+            if not any(span_name in x['tags'] for x in span_tables):
+                log(f'Warning: budget for unused span {profiler_name}:{span_name}')
 
     with open(output_fn, 'w') as outf:
-        outf.write('#include <array>\n#include <chrono>\n#include <limits>\n#include <eprofiler/eprofiler.hpp>\n')
+        outf.write('#include <array>\n#include <chrono>\n#include <limits>\n#include <eprofiler/eprofiler.hpp>\n#include <eprofiler/ecounter.hpp>\n')
 
         for hashtable_unique_type, hashtable_data in registered_hashtables.items():
 
@@ -722,7 +809,142 @@ if __name__ == "__main__":
             outf.write(f'template<>\nconst {hashtable_data["key_type"]} {hashtable_data["hashtable_type"].to_cpp_string()}::offset = {hashtable_data["offset"]};\n')
 
             if hashtable_data['gen_value_store']:
-                outf.write(f'std::array<{hashtable_data["value_type"]}, {len(hashtable_data["tags"])}> eprofiler_{hashtable_data["uuid"]}_value_store = {{}};')
+                value_store_init = '{}'
+                if hashtable_data['is_span_table']:
+                    # Initialise each span with its configured budget, unconfigured spans never overrun
+                    budgets = span_budgets.get(hashtable_data['profiler_name'], {})
+                    value_type = hashtable_data['value_type']
+                    span_inits = [ f'{value_type}{{ {value_type}::duration{{{budgets[tag_name]}}} }}' if tag_name in budgets else f'{value_type}{{}}'
+                                   for tag_name in hashtable_data['tags'] ]
+                    value_store_init = '{ ' + ', '.join(span_inits) + ' }'
+
+                # Counter shards are zero initialised by the empty initialiser, check they stay cache line aligned
+                if hashtable_data['is_counter']:
+                    outf.write(f'static_assert(alignof({hashtable_data["value_type"]}) >= eprofiler::ECOUNTER_ALIGNMENT, "Counter shards must be cache line aligned");\n')
+
+                outf.write(f'std::array<{hashtable_data["value_type"]}, {len(hashtable_data["tags"])}> eprofiler_{hashtable_data["uuid"]}_value_store = {value_store_init};')
                 outf.write(f'template<>\nconst std::span<{hashtable_data["value_type"]}> {hashtable_data["hashtable_type"].to_cpp_string()}::value_store = std::span{{ eprofiler_{hashtable_data["uuid"]}_value_store }};\n')
 
-    sys.exit(0)
+    return 0
+
+class GenRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Handles a single generation request sent by gen_client.py.
+    Request and response are single JSON lines.
+    """
+
+    def write_response(self, response : dict):
+        """
+        Writes a JSON response line to the client.
+
+        Parameters
+            response : dict -> Response to send
+        """
+        self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+    def handle(self):
+        """
+        Reads a request, runs the generation and responds with its exit code and output.
+        Requests from a client with a different gen.py version are answered with stale.
+        """
+        request_line = self.rfile.readline()
+        if not request_line:
+            # Connection only used to check whether the daemon is running
+            return
+
+        try:
+            request = json.loads(request_line)
+        except ValueError as e:
+            self.write_response({ 'returncode': 1, 'output': [ f'Error: malformed request: {e}' ] })
+            return
+
+        if not isinstance(request, dict) or 'output_fn' not in request or 'static_lib_fn' not in request:
+            self.write_response({ 'returncode': 1, 'output': [ 'Error: malformed request: missing output_fn or static_lib_fn' ] })
+            return
+
+        if request.get('gen_version') != self.server.gen_version:
+            # Let the client generate in-process, only stop serving if this daemon's own gen.py changed
+            self.write_response({ 'stale': True })
+            if gen_version() != self.server.gen_version:
+                threading.Thread(target=self.server.shutdown).start()
+            return
+
+        output = []
+        def log(*args):
+            output.append(' '.join(str(x) for x in args))
+
+        try:
+            returncode = generate(request['output_fn'], request['static_lib_fn'], request.get('budgets_fn'), log=log)
+        except Exception as e:
+            output.append(f'Error: {e}')
+            returncode = 1
+
+        self.write_response({ 'returncode': returncode, 'output': output })
+
+
+def serve(socket_fn : str) -> int:
+    """
+    Runs the generator daemon, sharing the warm parser and symbol cache between concurrent requests.
+
+    Parameters
+        socket_fn : str -> Unix socket path to listen on
+    Returns
+        int -> Exit code, 0 on success
+    """
+    if os.path.exists(socket_fn):
+        if is_daemon_running(socket_fn):
+            print(f'Error: daemon already running on {socket_fn}')
+            return 1
+        # Remove socket left behind by a daemon that did not shut down cleanly
+        try:
+            os.unlink(socket_fn)
+        except OSError as e:
+            print(f'Error: cannot remove stale socket {socket_fn}: {e}')
+            return 1
+
+    with socketserver.ThreadingUnixStreamServer(socket_fn, GenRequestHandler) as server:
+        server.daemon_threads = True
+        server.gen_version = gen_version()
+        os.chmod(socket_fn, 0o600)
+
+        # Signal handlers can only be installed from the main thread
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+
+        print(f'Serving gen.py requests on {socket_fn}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if os.path.exists(socket_fn):
+                os.unlink(socket_fn)
+
+    return 0
+
+if __name__ == "__main__":
+    # Setup argument parser
+    parser = argparse.ArgumentParser(
+                    prog='gen.py',
+                    description='Generates a C++ file with the unresolved symbols from a static library mapping to unique ids.'
+    )
+
+    parser.add_argument('output_fn', type=str, nargs='?', help='Output file name')
+    parser.add_argument('static_lib_fn', type=str, nargs='?', help='Static library file name')
+    parser.add_argument('--budgets', type=str, default=None,
+                        help='JSON file with span budgets { "<profiler>": { "<start>-><end>": <ticks> } }, '
+                             'budgets are integer ticks of the profiler clock\'s duration (e.g. ns for std::chrono::steady_clock)')
+    parser.add_argument('--serve', action='store_true', help='Run as a generator daemon for gen_client.py')
+    parser.add_argument('--socket', type=str, default=default_socket_path(), help='Unix socket path used with --serve')
+
+    # Parse arguments
+    args = parser.parse_args()
+
+    if args.serve:
+        sys.exit(serve(args.socket))
+
+    if args.output_fn is None or args.static_lib_fn is None:
+        parser.error('output_fn and static_lib_fn are required unless --serve is given')
+
+    sys.exit(generate(args.output_fn, args.static_lib_fn, args.budgets))
+
@@ -0,0 +1,172 @@
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sys
+import tempfile
+
+# Thin client for the gen.py daemon (gen.py --serve)
+# Only imports the standard library so each invocation avoids the Lark import and grammar construction,
+# falls back to in-process generation if the daemon isn't running or was started from an older gen.py
+
+GEN_PY_FN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gen.py')
+
+
+def default_socket_path() -> str:
+    """
+    Returns
+        str -> Socket path from EPROFILER_GEN_SOCKET or a per user and per checkout path in the temp directory
+    """
+    # Separate checkouts get separate daemons so they don't answer each other's requests
+    gen_py_hash = hashlib.sha256(GEN_PY_FN.encode('utf-8')).hexdigest()[:16]
+    return os.environ.get('EPROFILER_GEN_SOCKET', os.path.join(tempfile.gettempdir(), f'eprofiler-gen-{os.getuid()}-{gen_py_hash}.sock'))
+
+
+def gen_version() -> str:
+    """
+    Returns
+        str -> Version of gen.py on disk used to detect daemons running outdated code
+    """
+    stat = os.stat(GEN_PY_FN)
+    return f'{stat.st_mtime_ns}:{stat.st_size}'
+
+
+def connect(socket_fn : str) -> socket.socket:
+    """
+    Connects to the daemon, only if the socket is owned by the current user.
+
+    Parameters
+        socket_fn : str -> Unix socket path
+    Returns
+        socket.socket -> Connected socket, or None if no daemon of this user is listening
+    """
+    # The socket path is predictable, never send requests to a daemon run by another user
+    try:
+        if os.stat(socket_fn).st_uid != os.getuid():
+            return None
+    except OSError:
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(1.0)
+    try:
+        sock.connect(socket_fn)
+    except OSError:
+        sock.close()
+        return None
+    # Generation of large libraries can take a while
+    sock.settimeout(None)
+    return sock
+
+
+def is_daemon_running(socket_fn : str) -> bool:
+    """
+    Parameters
+        socket_fn : str -> Unix socket path
+    Returns
+        bool -> True if a daemon is listening on the socket
+    """
+    sock = connect(socket_fn)
+    if sock is None:
+        return False
+    sock.close()
+    return True
+
+
+def request_generation(socket_fn : str, output_fn : str, static_lib_fn : str, budgets_fn : str = None) -> int:
+    """
+    Sends a generation request to the daemon and prints its output.
+
+    Parameters
+        socket_fn : str -> Unix socket path
+        output_fn : str -> Output file name
+        static_lib_fn : str -> Static library file name
+        budgets_fn : str -> Optional JSON file with span budgets
+    Returns
+        int -> Exit code of the generation, or None if the daemon could not handle the request
+    """
+    sock = connect(socket_fn)
+    if sock is None:
+        return None
+
+    # The daemon has its own working directory
+    request = {
+        'gen_version': gen_version(),
+        'output_fn': os.path.abspath(output_fn),
+        'static_lib_fn': os.path.abspath(static_lib_fn),
+        'budgets_fn': os.path.abspath(budgets_fn) if budgets_fn is not None else None,
+    }
+
+    try:
+        with sock, sock.makefile('rwb') as f:
+            f.write(json.dumps(request).encode('utf-8') + b'\n')
+            f.flush()
+            response = f.readline()
+    except OSError:
+        return None
+
+    if not response:
+        return None
+
+    try:
+        response = json.loads(response)
+    except ValueError:
+        response = None
+
+    if not isinstance(response, dict):
+        print('Warning: malformed response from gen.py daemon, generating in-process')
+        return None
+
+    if response.get('stale', False):
+        print('Warning: gen.py daemon is outdated, generating in-process')
+        return None
+
+    output = response.get('output')
+    returncode = response.get('returncode')
+    if not isinstance(output, list) or type(returncode) != int:
+        print('Warning: malformed response from gen.py daemon, generating in-process')
+        return None
+
+    for line in output:
+        print(line)
+    return returncode
+
+
+def main(argv : list = None) -> int:
+    """
+    Runs generation through the daemon, falling back to in-process generation.
+
+    Parameters
+        argv : list -> Command line arguments, defaults to sys.argv[1:]
+    Returns
+        int -> Exit code, 0 on success
+    """
+    # Setup argument parser, mirrors gen.py
+    parser = argparse.ArgumentParser(
+                    prog='gen_client.py',
+                    description='Generates a C++ file with the unresolved symbols from a static library mapping to unique ids. '
+                                'Uses the gen.py daemon if running, otherwise generates in-process.'
+    )
+
+    parser.add_argument('output_fn', type=str, help='Output file name')
+    parser.add_argument('static_lib_fn', type=str, help='Static library file name')
+    parser.add_argument('--budgets', type=str, default=None,
+                        help='JSON file with span budgets { "<profiler>": { "<start>-><end>": <ticks> } }, '
+                             'budgets are integer ticks of the profiler clock\'s duration (e.g. ns for std::chrono::steady_clock)')
+    parser.add_argument('--socket', type=str, default=default_socket_path(), help='Unix socket path of the daemon')
+
+    args = parser.parse_args(argv)
+
+    returncode = request_generation(args.socket, args.output_fn, args.static_lib_fn, args.budgets)
+
+    if returncode is None:
+        # Daemon not available, pay the import and grammar construction cost in this process
+        import gen
+        returncode = gen.generate(args.output_fn, args.static_lib_fn, args.budgets)
+
+    return returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#ifndef EPROFILER_ECOUNTER_HPP
+#define EPROFILER_ECOUNTER_HPP
+
+#include <array>
+#include <atomic>
+#include <concepts>
+#include <cstddef>
+#include <cstdint>
+
+#include <eprofiler/eprofiler.hpp>
+#include <eprofiler/linktimehashtable.hpp>
+
+#include "stringconstant.hpp"
+
+namespace eprofiler {
+
+// Alignment of each counter shard, one cache line to avoid false sharing between shards and counters
+inline constexpr std::size_t ECOUNTER_ALIGNMENT = 64;
+
+namespace detail {
+
+// Threads are assigned shards round robin on first use
+inline std::size_t this_thread_shard() noexcept {
+    static std::atomic<std::size_t> next_shard{0};
+    thread_local const std::size_t shard = next_shard.fetch_add(1, std::memory_order_relaxed);
+    return shard;
+}
+
+} // namespace detail
+
+// Counter value, split into Shards cache line aligned atomics summed on read
+template<std::integral CountT, std::size_t Shards>
+struct ECounterCell {
+    static_assert(Shards > 0, "ECounterCell requires at least one shard");
+
+    struct alignas(ECOUNTER_ALIGNMENT) Shard {
+        std::atomic<CountT> value;
+    };
+
+    std::array<Shard, Shards> shards;
+
+    void add(CountT const count) noexcept {
+        if constexpr (Shards == 1) {
+            shards[0].value.fetch_add(count, std::memory_order_relaxed);
+        } else {
+            shards[detail::this_thread_shard() % Shards].value.fetch_add(count, std::memory_order_relaxed);
+        }
+    }
+
+    CountT load() const noexcept {
+        CountT total = 0;
+        for (auto const& shard : shards) {
+            total += shard.value.load(std::memory_order_relaxed);
+        }
+        return total;
+    }
+
+    void reset() noexcept {
+        for (auto& shard : shards) {
+            shard.value.store(0, std::memory_order_relaxed);
+        }
+    }
+}; // struct ECounterCell
+
+template<EProfilerTag CounterTag, std::integral IndexT, std::integral CountT = std::uint64_t, std::size_t Shards = 1>
+class ECounter : protected LinkTimeHashTable<ECounter<CounterTag, IndexT, CountT, Shards>, IndexT, ECounterCell<CountT, Shards>> {
+    using LinkTimeHashTableT = LinkTimeHashTable<ECounter<CounterTag, IndexT, CountT, Shards>, IndexT, ECounterCell<CountT, Shards>>;
+public:
+    using index_type = IndexT;
+    using count_type = CountT;
+
+    template<class CharT, CharT... Chars>
+    static void increment(StringConstant<CharT, Chars...> const tag, CountT const count = 1) noexcept {
+        LinkTimeHashTableT::at(tag).add(count);
+    }
+
+    template<class CharT, CharT... Chars>
+    static CountT get_count(StringConstant<CharT, Chars...> const tag) noexcept {
+        return LinkTimeHashTableT::at(tag).load();
+    }
+
+    template<class CharT, CharT... Chars>
+    static void reset(StringConstant<CharT, Chars...> const tag) noexcept {
+        LinkTimeHashTableT::at(tag).reset();
+    }
+
+    template<class CharT, CharT... Chars>
+    static IndexT get_id(StringConstant<CharT, Chars...> const tag) noexcept {
+        return LinkTimeHashTableT::get_id(tag);
+    }
+
+}; // class ECounter
+
+
+} // namespace eprofiler
+
+#endif
@@ -3,9 +3,12 @@
 
 #include <algorithm>
 #include <concepts>
+#include <cstdint>
+#include <limits>
 #include <optional>
 #include <span>
 #include <tuple>
+#include <utility>
 
 #include <eprofiler/uniquetype.hpp>
 #include <eprofiler/linktimehashtable.hpp>
@@ -23,12 +26,60 @@ struct EProfilerTag {
     }
 }; // struct EProfilerTag
 
+namespace detail {
+
+// Largest representable duration, supports both std::chrono::duration and arithmetic types
+template<class Duration>
+constexpr Duration max_duration() noexcept {
+    if constexpr (requires { Duration::max(); }) {
+        return Duration::max();
+    } else {
+        return std::numeric_limits<Duration>::max();
+    }
+}
+
+} // namespace detail
+
+// Per span budget and overrun record
+// budget is only set by gen.py from the budgets config, overruns are counted against either budget
+template<class Duration>
+struct EProfilerSpanBudget {
+    using duration = Duration;
+
+    duration budget = detail::max_duration<Duration>();
+    std::uint64_t overruns = 0;
+    duration worst_overrun = Duration{};
+
+    constexpr void record_overrun(duration const overrun) noexcept {
+        ++overruns;
+        worst_overrun = std::max(worst_overrun, overrun);
+    }
+}; // struct EProfilerSpanBudget
+
+// Unique type for the span budget table of a profiler
+template<EProfilerTag ProfilerTag, std::integral IndexT, class Duration>
+struct EProfilerSpans {
+};
+
+// Span tag "<start>-><end>" used as key in the span budget table
+template<class CharT, CharT... StartChars, CharT... EndChars>
+constexpr StringConstant<CharT, StartChars..., CharT('-'), CharT('>'), EndChars...> span_tag(StringConstant<CharT, StartChars...> const, StringConstant<CharT, EndChars...> const) noexcept {
+    return {};
+}
+
 template<EProfilerTag ProfilerTag, std::integral IndexT, class SteadyClock>
 class EProfiler : protected LinkTimeHashTable<EProfiler<ProfilerTag, IndexT, typename SteadyClock::time_point>, IndexT, typename SteadyClock::time_point> {
     using LinkTimeHashTableT = LinkTimeHashTable<EProfiler<ProfilerTag, IndexT, typename SteadyClock::time_point>, IndexT, typename SteadyClock::time_point>;
 public:
     using index_type = IndexT;
     using time_point = typename SteadyClock::time_point;
+    using duration = decltype(std::declval<time_point>() - std::declval<time_point>());
+    using span_budget = EProfilerSpanBudget<duration>;
+
+private:
+    using SpanTableT = LinkTimeHashTable<EProfilerSpans<ProfilerTag, IndexT, duration>, IndexT, span_budget>;
+
+public:
 
     template<class CharT, CharT... Chars>
     static void set_time(StringConstant<CharT, Chars...> const tag) noexcept {
@@ -45,6 +96,37 @@ public:
         return LinkTimeHashTableT::at(end) - LinkTimeHashTableT::at(start);
     }
 
+    // Sets the end time and counts an overrun if the span exceeded the budget configured in gen.py
+    template<class CharT, CharT... StartChars, CharT... EndChars>
+    static void end_span(StringConstant<CharT, StartChars...> const start, StringConstant<CharT, EndChars...> const end) noexcept {
+        const auto end_time = SteadyClock::now();
+        LinkTimeHashTableT::at(end) = end_time;
+
+        auto& span = SpanTableT::at(span_tag(start, end));
+        const auto elapsed = end_time - LinkTimeHashTableT::at(start);
+        if (elapsed > span.budget) [[unlikely]] {
+            span.record_overrun(elapsed - span.budget);
+        }
+    }
+
+    // Sets the end time and counts an overrun if the span exceeded the given budget
+    // The configured budget in the span record is left unchanged
+    template<class CharT, CharT... StartChars, CharT... EndChars>
+    static void end_span(StringConstant<CharT, StartChars...> const start, StringConstant<CharT, EndChars...> const end, duration const budget) noexcept {
+        const auto end_time = SteadyClock::now();
+        LinkTimeHashTableT::at(end) = end_time;
+
+        const auto elapsed = end_time - LinkTimeHashTableT::at(start);
+        if (elapsed > budget) [[unlikely]] {
+            SpanTableT::at(span_tag(start, end)).record_overrun(elapsed - budget);
+        }
+    }
+
+    template<class CharT, CharT... StartChars, CharT... EndChars>
+    static span_budget& get_span_budget(StringConstant<CharT, StartChars...> const start, StringConstant<CharT, EndChars...> const end) noexcept {
+        return SpanTableT::at(span_tag(start, end));
+    }
+
 }; // class EProfiler
 
 
@@ -34,7 +34,8 @@ private:
     // Private functions operating on StringConstant_WithID keys
     template<class CharT, CharT... Chars>
     static ValueType& at(StringConstant_WithID<CharT, Chars...> const& str) noexcept {
-        return value_store[str.to_id()];
+        // IDs are allocated globally by gen.py, offset is the first ID of this table
+        return value_store[str.to_id() - offset];
     }
 
 public:
@@ -0,0 +1,317 @@
+import argparse
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+# Statistical regression comparison between two eprofiler captures
+#
+# A capture is a set of (id, sample) pairs, where id is the tag id assigned by gen.py
+# and sample is a measured value (e.g. a get_duration result) in any consistent unit.
+# Captures are stored either as a .npy array of shape (N, 2) or as a text file with
+# one "id sample" (whitespace or comma separated) pair per line.
+#
+# IDs differ between builds, so samples are aligned by tag name using the .json ID map
+# gen.py writes next to the generated translation unit.
+
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+EXIT_ERROR = 2
+
+
+def load_id_map(id_map_fn : str, table_filter : str = None) -> dict:
+    """
+    Loads a gen.py ID map and inverts it to map ids to tag names.
+
+    Parameters
+        id_map_fn : str -> Path to the .json file generated by gen.py
+        table_filter : str -> Only use hashtables whose key contains this substring
+    Returns
+        dict -> Mapping of id to tag name
+    """
+    with open(id_map_fn, 'r') as f:
+        hash_info = json.load(f)
+
+    id_to_tag = {}
+    seen_tags = {}
+    for unique_type_key, tags in hash_info.items():
+        if table_filter is not None and table_filter not in unique_type_key:
+            continue
+
+        for tag_name, tag_id in tags.items():
+            if tag_name in seen_tags:
+                raise ValueError(f'Tag "{tag_name}" exists in both {seen_tags[tag_name]} and {unique_type_key}, use --table to select one')
+            seen_tags[tag_name] = unique_type_key
+            id_to_tag[int(tag_id)] = tag_name
+
+    return id_to_tag
+
+
+def load_capture(capture_fn : str) -> np.ndarray:
+    """
+    Loads a capture file into an (N, 2) array of [id, sample] rows.
+
+    Parameters
+        capture_fn : str -> Path to a .npy or text capture file
+    Returns
+        np.ndarray -> Array of shape (N, 2)
+    """
+    if capture_fn.endswith('.npy'):
+        capture = np.load(capture_fn)
+    else:
+        with open(capture_fn, 'r') as f:
+            delimiter = ',' if ',' in f.readline() else None
+        capture = np.loadtxt(capture_fn, delimiter=delimiter, ndmin=2)
+
+    if capture.ndim != 2 or capture.shape[1] != 2:
+        raise ValueError(f'{capture_fn} must contain (id, sample) pairs, got shape {capture.shape}')
+
+    return capture
+
+
+def load_spans(capture_fns : list, id_to_tag : dict) -> dict:
+    """
+    Loads and concatenates captures, grouping the samples by tag name.
+
+    Parameters
+        capture_fns : list -> Paths to capture files from the same build
+        id_to_tag : dict -> Mapping of id to tag name for that build
+    Returns
+        dict -> Mapping of tag name to a float64 array of samples
+    """
+    capture = np.concatenate([ load_capture(fn) for fn in capture_fns ])
+    ids = capture[:, 0].astype(np.int64)
+    samples = capture[:, 1].astype(np.float64)
+
+    # Group by id with a single sort instead of one boolean mask per tag
+    order = np.argsort(ids, kind='stable')
+    ids = ids[order]
+    samples = samples[order]
+    unique_ids, starts = np.unique(ids, return_index=True)
+
+    spans = {}
+    for tag_id, group in zip(unique_ids, np.split(samples, starts[1:])):
+        tag_name = id_to_tag.get(int(tag_id))
+        if tag_name is not None:
+            spans[tag_name] = group
+    return spans
+
+
+def mann_whitney_greater(candidate : np.ndarray, baseline : np.ndarray) -> float:
+    """
+    One sided Mann-Whitney U test that candidate samples are stochastically greater than baseline.
+    Uses the tie corrected normal approximation, which is accurate for the sample sizes profiling produces.
+
+    Parameters
+        candidate : np.ndarray -> Candidate samples
+        baseline : np.ndarray -> Baseline samples
+    Returns
+        float -> p-value
+    """
+    n1 = candidate.size
+    n2 = baseline.size
+    n = n1 + n2
+
+    # Average ranks for ties computed from the run lengths of the sorted values
+    _, inverse, counts = np.unique(np.concatenate((candidate, baseline)), return_inverse=True, return_counts=True)
+    ends = np.cumsum(counts, dtype=np.float64)
+    average_ranks = ends - (counts - 1) / 2.0
+
+    u1 = average_ranks[inverse[:n1]].sum() - n1 * (n1 + 1) / 2.0
+    mean = n1 * n2 / 2.0
+
+    tie_term = np.sum(counts.astype(np.float64) ** 3 - counts) / (n * (n - 1))
+    variance = n1 * n2 / 12.0 * ((n + 1) - tie_term)
+    if variance <= 0:
+        # All samples identical
+        return 1.0
+
+    # Continuity correction towards the mean
+    z = (u1 - mean - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def bootstrap_relative_change(candidate : np.ndarray, baseline : np.ndarray, quantile : float, alpha : float,
+                              resamples : int, max_samples : int, rng : np.random.Generator) -> float:
+    """
+    Bootstrap lower confidence bound of the relative change of a quantile.
+    Each side is subsampled to at most max_samples before resampling which keeps the cost bounded
+    and only makes the bound more conservative.
+
+    Parameters
+        candidate : np.ndarray -> Candidate samples
+        baseline : np.ndarray -> Baseline samples
+        quantile : float -> Quantile compared between the captures
+        alpha : float -> One sided significance level
+        resamples : int -> Number of bootstrap resamples
+        max_samples : int -> Subsample size limit per side
+        rng : np.random.Generator -> Random number generator
+    Returns
+        float -> Lower bound of (candidate - baseline) / baseline
+    """
+    def resampled_quantiles(samples):
+        if samples.size > max_samples:
+            samples = rng.choice(samples, max_samples, replace=False)
+
+        quantiles = np.empty(resamples)
+        # Resample in batches to bound memory at ~128 MiB per batch (int64 indices plus float64 resampled values)
+        batch = max(1, (1 << 23) // samples.size)
+        for start in range(0, resamples, batch):
+            stop = min(start + batch, resamples)
+            indices = rng.integers(0, samples.size, size=(stop - start, samples.size))
+            quantiles[start:stop] = np.quantile(samples[indices], quantile, axis=1)
+        return quantiles
+
+    base_q = resampled_quantiles(baseline)
+    cand_q = resampled_quantiles(candidate)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = (cand_q - base_q) / np.abs(base_q)
+    return float(np.nanquantile(relative, alpha))
+
+
+def compare_spans(baseline_spans : dict, candidate_spans : dict, args) -> list:
+    """
+    Compares the spans present in both captures.
+
+    Parameters
+        baseline_spans : dict -> Mapping of tag name to baseline samples
+        candidate_spans : dict -> Mapping of tag name to candidate samples
+        args : argparse.Namespace -> Parsed command line arguments
+    Returns
+        list -> One result dict per span
+    """
+    rng = np.random.default_rng(args.seed)
+    results = []
+
+    for tag_name in sorted(baseline_spans.keys() | candidate_spans.keys()):
+        baseline = baseline_spans.get(tag_name)
+        candidate = candidate_spans.get(tag_name)
+
+        if baseline is None or candidate is None or min(baseline.size, candidate.size) < args.min_samples:
+            # A span missing on one side was removed or renamed and fails the gate with --fail-on-missing
+            missing = baseline is None or candidate is None
+            results.append({ 'tag': tag_name, 'skipped': True, 'missing': missing,
+                             'regressed': missing and args.fail_on_missing,
+                             'baseline_n': 0 if baseline is None else baseline.size,
+                             'candidate_n': 0 if candidate is None else candidate.size })
+            continue
+
+        base_q = float(np.quantile(baseline, args.quantile))
+        cand_q = float(np.quantile(candidate, args.quantile))
+        if base_q != 0:
+            change = (cand_q - base_q) / abs(base_q)
+        else:
+            change = math.inf if cand_q > 0 else 0.0
+
+        result = {
+            'tag': tag_name,
+            'skipped': False,
+            'missing': False,
+            'baseline_n': baseline.size,
+            'candidate_n': candidate.size,
+            'baseline': base_q,
+            'candidate': cand_q,
+            'change': change,
+        }
+
+        if args.method == 'mannwhitney':
+            result['p_value'] = mann_whitney_greater(candidate, baseline)
+            result['regressed'] = result['p_value'] < args.alpha and change > args.threshold
+        else:
+            result['change_lower'] = bootstrap_relative_change(candidate, baseline, args.quantile, args.alpha,
+                                                               args.resamples, args.max_bootstrap_samples, rng)
+            result['regressed'] = result['change_lower'] > args.threshold
+
+        results.append(result)
+
+    return results
+
+
+def print_results(results : list, method : str):
+    """
+    Prints a table of comparison results.
+
+    Parameters
+        results : list -> Results returned by compare_spans
+        method : str -> Statistical method used
+    """
+    stat_header = 'p-value' if method == 'mannwhitney' else 'change lb'
+    print(f'{"span":<32} {"n base":>10} {"n cand":>10} {"baseline":>14} {"candidate":>14} {"change":>9} {stat_header:>10}  verdict')
+
+    for result in results:
+        if result['skipped']:
+            verdict = 'MISSING' if result['missing'] else 'skipped'
+            print(f'{result["tag"]:<32} {result["baseline_n"]:>10} {result["candidate_n"]:>10} {"":>14} {"":>14} {"":>9} {"":>10}  {verdict}')
+            continue
+
+        stat = f'{result["p_value"]:.2e}' if method == 'mannwhitney' else f'{result["change_lower"]:+.2%}'
+        verdict = 'REGRESSED' if result['regressed'] else 'ok'
+        print(f'{result["tag"]:<32} {result["baseline_n"]:>10} {result["candidate_n"]:>10} '
+              f'{result["baseline"]:>14.6g} {result["candidate"]:>14.6g} {result["change"]:>+9.2%} {stat:>10}  {verdict}')
+
+
+def main(argv : list = None) -> int:
+    """
+    Runs the comparison command line tool.
+
+    Parameters
+        argv : list -> Command line arguments, defaults to sys.argv[1:]
+    Returns
+        int -> Exit code, EXIT_OK, EXIT_REGRESSION or EXIT_ERROR
+    """
+    # Setup argument parser
+    parser = argparse.ArgumentParser(
+                    prog='compare.py',
+                    description='Compares per-span sample distributions of two eprofiler captures. '
+                                'Exits with 1 if any span regressed past the threshold or is missing from one capture, '
+                                'and 2 on input errors.'
+    )
+
+    parser.add_argument('--baseline', type=str, nargs='+', required=True, help='Baseline capture files (.npy or text)')
+    parser.add_argument('--baseline-map', type=str, required=True, help='gen.py .json ID map of the baseline build')
+    parser.add_argument('--candidate', type=str, nargs='+', required=True, help='Candidate capture files (.npy or text)')
+    parser.add_argument('--candidate-map', type=str, required=True, help='gen.py .json ID map of the candidate build')
+    parser.add_argument('--table', type=str, default=None, help='Only compare tags of hashtables whose key contains this substring')
+    parser.add_argument('--method', choices=['mannwhitney', 'bootstrap'], default='mannwhitney', help='Statistical test')
+    parser.add_argument('--quantile', type=float, default=0.5, help='Quantile compared between captures (default: median)')
+    parser.add_argument('--threshold', type=float, default=0.05, help='Relative increase treated as a regression (default: 0.05)')
+    parser.add_argument('--alpha', type=float, default=0.01, help='Significance level (default: 0.01)')
+    parser.add_argument('--min-samples', type=int, default=20, help='Skip spans with fewer samples on either side')
+    parser.add_argument('--fail-on-missing', dest='fail_on_missing', action='store_true', default=True,
+                        help='Fail if a span only exists in one of the captures (default)')
+    parser.add_argument('--no-fail-on-missing', dest='fail_on_missing', action='store_false',
+                        help='Only report spans which exist in one of the captures')
+    parser.add_argument('--resamples', type=int, default=1000, help='Bootstrap resamples')
+    parser.add_argument('--max-bootstrap-samples', type=int, default=10000, help='Per side subsample size used for bootstrapping')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for bootstrap resampling')
+
+    # Parse and unpack arguments
+    args = parser.parse_args(argv)
+
+    # Validate file paths
+    for fn in [*args.baseline, args.baseline_map, *args.candidate, args.candidate_map]:
+        if not os.path.exists(fn):
+            print(f'Error: {fn} does not exist')
+            return EXIT_ERROR
+
+    try:
+        baseline_spans = load_spans(args.baseline, load_id_map(args.baseline_map, args.table))
+        candidate_spans = load_spans(args.candidate, load_id_map(args.candidate_map, args.table))
+    except ValueError as e:
+        print(f'Error: {e}')
+        return EXIT_ERROR
+
+    results = compare_spans(baseline_spans, candidate_spans, args)
+    print_results(results, args.method)
+
+    if any(result['regressed'] for result in results):
+        return EXIT_REGRESSION
+
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
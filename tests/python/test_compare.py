@@ -0,0 +1,157 @@
+import contextlib
+import io
+import itertools
+import json
+import math
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+# Run with: python -m unittest discover -s tests/python
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'eprofiler', 'tools'))
+
+import compare
+
+
+def brute_force_p_value(candidate, baseline):
+    """
+    Mann-Whitney p-value computed from pairwise comparisons, reference for mann_whitney_greater.
+    """
+    n1, n2 = len(candidate), len(baseline)
+    u1 = sum(1.0 if x > y else 0.5 if x == y else 0.0 for x, y in itertools.product(candidate, baseline))
+
+    _, counts = np.unique(np.concatenate((candidate, baseline)), return_counts=True)
+    n = n1 + n2
+    variance = n1 * n2 / 12.0 * ((n + 1) - np.sum(counts.astype(float) ** 3 - counts) / (n * (n - 1)))
+    z = (u1 - n1 * n2 / 2.0 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+class TestMannWhitney(unittest.TestCase):
+
+    def test_matches_brute_force_with_ties(self):
+        rng = np.random.default_rng(0)
+        candidate = rng.integers(0, 10, 60).astype(np.float64)
+        baseline = rng.integers(0, 9, 50).astype(np.float64)
+        self.assertAlmostEqual(compare.mann_whitney_greater(candidate, baseline), brute_force_p_value(candidate, baseline), places=12)
+
+    def test_detects_shift(self):
+        rng = np.random.default_rng(1)
+        baseline = rng.normal(100, 5, 5000)
+        self.assertLess(compare.mann_whitney_greater(baseline + 2, baseline), 1e-6)
+        self.assertGreater(compare.mann_whitney_greater(baseline - 2, baseline), 0.99)
+
+    def test_identical_samples(self):
+        samples = np.full(100, 3.0)
+        self.assertEqual(compare.mann_whitney_greater(samples, samples), 1.0)
+
+
+class CaptureTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def write_map(self, name, hash_info):
+        with open(self.path(name), 'w') as f:
+            json.dump(hash_info, f)
+        return self.path(name)
+
+    def write_capture(self, name, spans):
+        """
+        Writes a .npy capture from a mapping of id to samples.
+        """
+        capture = np.concatenate([ np.column_stack((np.full(len(samples), tag_id), samples)) for tag_id, samples in spans.items() ])
+        np.save(self.path(name), capture)
+        return self.path(name)
+
+
+class TestLoadIdMap(CaptureTestCase):
+
+    def test_inverts_map(self):
+        id_map_fn = self.write_map('map.json', { 'eprofiler::EProfiler<"A", int, int>': { 'Tag1': 1, 'Tag2': 2 } })
+        self.assertEqual(compare.load_id_map(id_map_fn), { 1: 'Tag1', 2: 'Tag2' })
+
+    def test_duplicate_tag_raises(self):
+        id_map_fn = self.write_map('map.json', { 'eprofiler::EProfiler<"A", int, int>': { 'Tag1': 1 },
+                                                 'eprofiler::EProfiler<"B", int, int>': { 'Tag1': 2 } })
+        with self.assertRaises(ValueError):
+            compare.load_id_map(id_map_fn)
+
+    def test_table_filter(self):
+        id_map_fn = self.write_map('map.json', { 'eprofiler::EProfiler<"A", int, int>': { 'Tag1': 1 },
+                                                 'eprofiler::EProfiler<"B", int, int>': { 'Tag1': 2 } })
+        self.assertEqual(compare.load_id_map(id_map_fn, '"B"'), { 2: 'Tag1' })
+
+
+class TestLoadSpans(CaptureTestCase):
+
+    def test_groups_by_tag_across_files(self):
+        first = self.write_capture('first.npy', { 3: [ 1.0, 2.0 ], 1: [ 10.0 ] })
+        with open(self.path('second.csv'), 'w') as f:
+            f.write('1,11\n3,3\n7,99\n')
+
+        spans = compare.load_spans([ first, self.path('second.csv') ], { 1: 'Tag1', 3: 'Tag3' })
+
+        # Unknown id 7 is dropped
+        self.assertEqual(sorted(spans.keys()), [ 'Tag1', 'Tag3' ])
+        np.testing.assert_array_equal(spans['Tag1'], [ 10.0, 11.0 ])
+        np.testing.assert_array_equal(spans['Tag3'], [ 1.0, 2.0, 3.0 ])
+
+    def test_rejects_bad_shape(self):
+        np.save(self.path('bad.npy'), np.zeros((4, 3)))
+        with self.assertRaises(ValueError):
+            compare.load_spans([ self.path('bad.npy') ], {})
+
+
+class TestExitCodes(CaptureTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # IDs differ between builds, spans are aligned by tag name
+        self.baseline_map = self.write_map('baseline.json', { 'eprofiler::EProfiler<"A", int, int>': { 'Fast': 1, 'Slow': 2 } })
+        self.candidate_map = self.write_map('candidate.json', { 'eprofiler::EProfiler<"A", int, int>': { 'Slow': 1, 'Fast': 2 } })
+        rng = np.random.default_rng(2)
+        self.fast = rng.normal(100, 5, 2000)
+        self.slow = rng.normal(200, 5, 2000)
+
+    def run_main(self, baseline, candidate, *extra_args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return compare.main([ '--baseline', baseline, '--baseline-map', self.baseline_map,
+                                  '--candidate', candidate, '--candidate-map', self.candidate_map, *extra_args ])
+
+    def test_no_regression(self):
+        baseline = self.write_capture('baseline.npy', { 1: self.fast, 2: self.slow })
+        candidate = self.write_capture('candidate.npy', { 2: self.fast, 1: self.slow })
+        self.assertEqual(self.run_main(baseline, candidate), compare.EXIT_OK)
+        self.assertEqual(self.run_main(baseline, candidate, '--method', 'bootstrap', '--seed', '0', '--resamples', '200'), compare.EXIT_OK)
+
+    def test_regression(self):
+        baseline = self.write_capture('baseline.npy', { 1: self.fast, 2: self.slow })
+        candidate = self.write_capture('candidate.npy', { 2: self.fast * 1.2, 1: self.slow })
+        self.assertEqual(self.run_main(baseline, candidate), compare.EXIT_REGRESSION)
+        self.assertEqual(self.run_main(baseline, candidate, '--method', 'bootstrap', '--seed', '0', '--resamples', '200'), compare.EXIT_REGRESSION)
+
+    def test_missing_span(self):
+        baseline = self.write_capture('baseline.npy', { 1: self.fast, 2: self.slow })
+        candidate = self.write_capture('candidate.npy', { 2: self.fast })
+        self.assertEqual(self.run_main(baseline, candidate), compare.EXIT_REGRESSION)
+        self.assertEqual(self.run_main(baseline, candidate, '--no-fail-on-missing'), compare.EXIT_OK)
+
+    def test_input_errors(self):
+        baseline = self.write_capture('baseline.npy', { 1: self.fast })
+        self.assertEqual(self.run_main(baseline, self.path('does_not_exist.npy')), compare.EXIT_ERROR)
+
+        np.save(self.path('bad.npy'), np.zeros(5))
+        self.assertEqual(self.run_main(baseline, self.path('bad.npy')), compare.EXIT_ERROR)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,311 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+# Run with: python -m unittest discover -s tests/python
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+INCLUDE_DIR = os.path.join(REPO_DIR, 'eprofiler', 'include')
+sys.path.insert(0, os.path.join(REPO_DIR, 'eprofiler', 'gen'))
+
+import gen
+import gen_client
+
+CXX = os.environ.get('CXX', 'g++')
+
+# Profilers ending spans, "Dup" is used with two clocks of different duration types
+SPANS_SOURCE = r'''
+#include <chrono>
+#include <eprofiler/eprofiler.hpp>
+using namespace eprofiler::literals;
+
+struct IntClock {
+    using time_point = int;
+    static time_point now() { return 0; }
+};
+
+void spans() {
+    eprofiler::EProfiler<eprofiler::EProfilerTag{"Budget"}, int, IntClock>::end_span("Start"_sc, "End"_sc);
+    eprofiler::EProfiler<eprofiler::EProfilerTag{"Dup"}, int, IntClock>::end_span("A"_sc, "B"_sc);
+    eprofiler::EProfiler<eprofiler::EProfilerTag{"Dup"}, int, std::chrono::steady_clock>::end_span("A"_sc, "B"_sc);
+}
+'''
+
+
+def build_static_lib(directory : str) -> str:
+    """
+    Compiles SPANS_SOURCE into a static library.
+
+    Parameters
+        directory : str -> Directory for the source, object and library
+    Returns
+        str -> Path of the static library
+    """
+    source_fn = os.path.join(directory, 'spans.cpp')
+    object_fn = os.path.join(directory, 'spans.o')
+    static_lib_fn = os.path.join(directory, 'libspans.a')
+
+    with open(source_fn, 'w') as f:
+        f.write(SPANS_SOURCE)
+    subprocess.run([ CXX, '-std=c++20', f'-I{INCLUDE_DIR}', '-c', source_fn, '-o', object_fn ], check=True)
+    subprocess.run([ 'ar', 'rcs', static_lib_fn, object_fn ], check=True)
+    return static_lib_fn
+
+
+@unittest.skipUnless(all(shutil.which(tool) for tool in (CXX, 'ar', 'nm', 'c++filt')), 'requires a C++20 compiler and binutils')
+class GenTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.libdir = tempfile.TemporaryDirectory()
+        cls.static_lib_fn = build_static_lib(cls.libdir.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.libdir.cleanup()
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def generate(self, output_name='gen.cpp', budgets=None):
+        """
+        Runs gen.generate, returning the exit code and logged lines.
+        """
+        budgets_fn = None
+        if budgets is not None:
+            budgets_fn = self.path('budgets.json')
+            with open(budgets_fn, 'w') as f:
+                f.write(budgets)
+
+        output = []
+        returncode = gen.generate(self.path(output_name), self.static_lib_fn, budgets_fn,
+                                  log=lambda *args: output.append(' '.join(str(x) for x in args)))
+        return returncode, output
+
+
+class TestValidateSpanBudgets(unittest.TestCase):
+
+    def test_valid(self):
+        self.assertIsNone(gen.validate_span_budgets({}))
+        self.assertIsNone(gen.validate_span_budgets({ 'Test': { 'A->B': 0, 'A->C': 5000 } }))
+
+    def test_not_a_dict(self):
+        self.assertIsNotNone(gen.validate_span_budgets([ 1 ]))
+        self.assertIsNotNone(gen.validate_span_budgets({ 'Test': 5 }))
+
+    def test_invalid_budgets(self):
+        for budget in (0.5, '5ms', -1, True, None):
+            with self.subTest(budget=budget):
+                self.assertIsNotNone(gen.validate_span_budgets({ 'Test': { 'A->B': budget } }))
+
+
+class TestGenerateBudgets(GenTestCase):
+
+    def test_configured_budget(self):
+        returncode, output = self.generate(budgets='{ "Budget": { "Start->End": 5 } }')
+        self.assertEqual(returncode, 0, output)
+
+        with open(self.path('gen.cpp'), 'r') as f:
+            self.assertIn('::duration{5}', f.read())
+
+    def test_invalid_config(self):
+        for budgets in ('[ 1 ]', '{ "Budget": 5 }', '{ "Budget": { "Start->End": 0.5 } }',
+                        '{ "Budget": { "Start->End": "5ms" } }', '{ "Budget": { "Start->End": -1 } }'):
+            with self.subTest(budgets=budgets):
+                returncode, output = self.generate(budgets=budgets)
+                self.assertEqual(returncode, 1)
+                self.assertTrue(any(line.startswith('Error:') for line in output), output)
+
+    def test_ambiguous_duration_types(self):
+        returncode, output = self.generate(budgets='{ "Dup": { "A->B": 5 } }')
+        self.assertEqual(returncode, 1)
+        self.assertTrue(any('ambiguous' in line for line in output), output)
+
+        # Profilers sharing a name are fine without budgets
+        returncode, output = self.generate()
+        self.assertEqual(returncode, 0, output)
+
+    def test_unused_span_warning(self):
+        returncode, output = self.generate(budgets='{ "Budget": { "Start->End": 5, "Start->Nope": 1 } }')
+        self.assertEqual(returncode, 0, output)
+        self.assertIn('Warning: budget for unused span Budget:Start->Nope', output)
+
+
+class TestDaemon(GenTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.socket_fn = self.path('gen.sock')
+
+    def start_daemon(self):
+        """
+        Runs gen.serve on the test socket in a thread until the test finishes.
+        """
+        self.serve_returncode = None
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.serve_returncode = gen.serve(self.socket_fn)
+
+        self.daemon = threading.Thread(target=run)
+        self.daemon.start()
+        self.addCleanup(self.stop_daemon)
+
+        deadline = time.monotonic() + 10.0
+        while not gen_client.is_daemon_running(self.socket_fn):
+            self.assertTrue(self.daemon.is_alive(), 'daemon exited')
+            self.assertLess(time.monotonic(), deadline, 'daemon did not start')
+            time.sleep(0.01)
+
+    def stop_daemon(self):
+        # A stale request while the daemon's own gen.py changed shuts it down
+        with mock.patch.object(gen, 'gen_version', return_value='changed'):
+            self.assertEqual(self.send_raw({ 'gen_version': 'changed', 'output_fn': '', 'static_lib_fn': '' }), { 'stale': True })
+            self.daemon.join(10.0)
+        self.assertFalse(self.daemon.is_alive())
+        self.assertEqual(self.serve_returncode, 0)
+        self.assertFalse(os.path.exists(self.socket_fn))
+
+    def send_raw(self, request):
+        """
+        Sends a request bypassing gen_client, returning the decoded response.
+        """
+        if not isinstance(request, bytes):
+            request = json.dumps(request).encode('utf-8') + b'\n'
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock, sock.makefile('rwb') as f:
+            sock.connect(self.socket_fn)
+            f.write(request)
+            f.flush()
+            return json.loads(f.readline())
+
+    def request_generation(self, output_fn, budgets_fn=None):
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            returncode = gen_client.request_generation(self.socket_fn, output_fn, self.static_lib_fn, budgets_fn)
+        return returncode, stdout.getvalue()
+
+    def test_matches_in_process_output(self):
+        self.start_daemon()
+
+        # Same file names in separate directories, the generated file refers to its .json by name
+        os.mkdir(self.path('daemon'))
+        os.mkdir(self.path('in_process'))
+        returncode, output = self.request_generation(self.path(os.path.join('daemon', 'gen.cpp')))
+        self.assertEqual(returncode, 0, output)
+        returncode, output = self.generate(os.path.join('in_process', 'gen.cpp'))
+        self.assertEqual(returncode, 0, output)
+
+        for name in ('gen.cpp', 'gen.json'):
+            with self.subTest(name=name):
+                with open(self.path(os.path.join('daemon', name)), 'rb') as daemon_f, \
+                     open(self.path(os.path.join('in_process', name)), 'rb') as in_process_f:
+                    self.assertEqual(daemon_f.read(), in_process_f.read())
+
+    def test_errors_are_returned(self):
+        self.start_daemon()
+
+        with open(self.path('budgets.json'), 'w') as f:
+            f.write('{ "Budget": 5 }')
+        returncode, output = self.request_generation(self.path('gen.cpp'), self.path('budgets.json'))
+        self.assertEqual(returncode, 1)
+        self.assertIn('Error:', output)
+
+    def test_stale_version_falls_back(self):
+        self.start_daemon()
+
+        with mock.patch.object(gen_client, 'gen_version', return_value='other'):
+            returncode, output = self.request_generation(self.path('gen.cpp'))
+            self.assertIsNone(returncode)
+            self.assertIn('outdated', output)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(gen_client.main([ '--socket', self.socket_fn, self.path('gen.cpp'), self.static_lib_fn ]), 0)
+            self.assertTrue(os.path.exists(self.path('gen.json')))
+
+        # The daemon's own gen.py is unchanged so it keeps serving
+        self.assertTrue(gen_client.is_daemon_running(self.socket_fn))
+
+    def test_malformed_request(self):
+        self.start_daemon()
+
+        for request in (b'not json\n', b'[ 1 ]\n', b'{ "output_fn": "gen.cpp" }\n'):
+            with self.subTest(request=request):
+                response = self.send_raw(request)
+                self.assertEqual(response['returncode'], 1)
+                self.assertTrue(response['output'][0].startswith('Error:'), response)
+
+    def test_is_daemon_running(self):
+        self.assertFalse(gen_client.is_daemon_running(self.socket_fn))
+        self.start_daemon()
+        self.assertTrue(gen_client.is_daemon_running(self.socket_fn))
+
+        # A second daemon on the same socket refuses to start
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(gen.serve(self.socket_fn), 1)
+
+    def test_stale_socket_is_removed(self):
+        # Socket file left behind with nothing listening on it
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(self.socket_fn)
+        self.assertTrue(os.path.exists(self.socket_fn))
+        self.assertFalse(gen_client.is_daemon_running(self.socket_fn))
+
+        self.start_daemon()
+        self.assertTrue(gen_client.is_daemon_running(self.socket_fn))
+
+    def test_socket_of_other_user_is_ignored(self):
+        self.start_daemon()
+
+        with mock.patch.object(gen_client.os, 'getuid', return_value=os.getuid() + 1):
+            self.assertFalse(gen_client.is_daemon_running(self.socket_fn))
+            self.assertIsNone(self.request_generation(self.path('gen.cpp'))[0])
+        self.assertFalse(os.path.exists(self.path('gen.json')))
+
+
+class TestClientResponses(GenTestCase):
+
+    def fake_daemon(self, response):
+        """
+        Listens on a socket answering a single request with response, returning the socket path.
+        """
+        socket_fn = self.path('fake.sock')
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(socket_fn)
+        server.listen(1)
+        self.addCleanup(server.close)
+
+        def run():
+            connection, _ = server.accept()
+            with connection, connection.makefile('rwb') as f:
+                f.readline()
+                f.write(response)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.addCleanup(thread.join)
+        return socket_fn
+
+    def test_malformed_response_falls_back(self):
+        for response in (b'', b'garbage\n', b'{ "returncode": 0\n', b'[ 0 ]\n',
+                         b'{ "output": 5, "returncode": 0 }\n', b'{ "output": [], "returncode": "0" }\n'):
+            with self.subTest(response=response):
+                socket_fn = self.fake_daemon(response)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.assertIsNone(gen_client.request_generation(socket_fn, self.path('gen.cpp'), self.static_lib_fn))
+                os.unlink(socket_fn)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#include <catch2/catch_test_macros.hpp>
+
+#include <thread>
+#include <vector>
+
+#include <eprofiler/ecounter.hpp>
+using namespace eprofiler::literals;
+
+TEST_CASE("Verify ECounter class functionality", "[ECounter]") {
+    using ECounter = eprofiler::ECounter<eprofiler::EProfilerTag{"Test"}, int>;
+
+    SECTION("increment, get_count and reset methods") {
+        ECounter::reset("Retries"_sc);
+        ECounter::reset("Drops"_sc);
+
+        REQUIRE(ECounter::get_count("Retries"_sc) == 0);
+        REQUIRE(ECounter::get_count("Drops"_sc) == 0);
+
+        ECounter::increment("Retries"_sc);
+        ECounter::increment("Retries"_sc);
+        ECounter::increment("Drops"_sc, 5);
+
+        REQUIRE(ECounter::get_count("Retries"_sc) == 2);
+        REQUIRE(ECounter::get_count("Drops"_sc) == 5);
+
+        ECounter::reset("Retries"_sc);
+
+        REQUIRE(ECounter::get_count("Retries"_sc) == 0);
+        REQUIRE(ECounter::get_count("Drops"_sc) == 5);
+    }
+
+    SECTION("unique ids") {
+        REQUIRE(ECounter::get_id("Retries"_sc) != ECounter::get_id("Drops"_sc));
+    }
+}
+
+TEST_CASE("Verify sharded ECounter with concurrent increments", "[ECounter]") {
+    using ECounter = eprofiler::ECounter<eprofiler::EProfilerTag{"Sharded"}, int, std::uint64_t, 4>;
+
+    constexpr int thread_count = 8;
+    constexpr int increments = 10000;
+
+    ECounter::reset("Events"_sc);
+
+    std::vector<std::thread> threads;
+    for (int i = 0; i < thread_count; ++i) {
+        threads.emplace_back([] {
+            for (int j = 0; j < increments; ++j) {
+                ECounter::increment("Events"_sc);
+            }
+        });
+    }
+    for (auto& thread : threads) {
+        thread.join();
+    }
+
+    REQUIRE(ECounter::get_count("Events"_sc) == thread_count * increments);
+
+    // Threads are assigned shards round robin, so every shard of the cell received increments
+    using LinkTimeHashTable = eprofiler::LinkTimeHashTable<ECounter, int, eprofiler::ECounterCell<std::uint64_t, 4>>;
+    for (auto const& shard : LinkTimeHashTable::at("Events"_sc).shards) {
+        REQUIRE(shard.value.load() > 0);
+        REQUIRE(shard.value.load() < thread_count * increments);
+    }
+}
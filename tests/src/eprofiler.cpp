@@ -78,4 +78,90 @@ TEST_CASE("Verify EProfiler functionality with std::steady_clock", "[EProfiler]"
         REQUIRE(dur_cast(EProfiler::get_duration("Tag1"_sc, "Tag3"_sc)) == std::chrono::milliseconds(20));
         REQUIRE(dur_cast(EProfiler::get_duration("Tag2"_sc, "Tag3"_sc)) == std::chrono::milliseconds(10));
     }
-}
\ No newline at end of file
+}
+
+TEST_CASE("Verify EProfiler span budgets", "[EProfiler]") {
+    struct SteadyClock {
+        using time_point = int;
+
+        static time_point now(int set_time = -1) {
+            static int current_time = 0;
+            if (set_time >= 0) {
+                current_time = set_time;
+            }
+            return current_time;
+        }
+    };
+
+    using EProfiler = eprofiler::EProfiler<eprofiler::EProfilerTag{"Budget"}, int, SteadyClock>;
+
+    SECTION("end_span with budget from gen.py config") {
+        // Budget of "Start->End" is set to 5 in tests/budgets.json
+        REQUIRE(EProfiler::get_span_budget("Start"_sc, "End"_sc).budget == 5);
+
+        SteadyClock::now(0);
+        EProfiler::set_time("Start"_sc);
+        SteadyClock::now(5);
+        EProfiler::end_span("Start"_sc, "End"_sc);
+
+        REQUIRE(EProfiler::get_span_budget("Start"_sc, "End"_sc).overruns == 0);
+
+        SteadyClock::now(10);
+        EProfiler::set_time("Start"_sc);
+        SteadyClock::now(18);
+        EProfiler::end_span("Start"_sc, "End"_sc);
+        SteadyClock::now(20);
+        EProfiler::set_time("Start"_sc);
+        SteadyClock::now(26);
+        EProfiler::end_span("Start"_sc, "End"_sc);
+
+        REQUIRE(EProfiler::get_duration("Start"_sc, "End"_sc) == 6);
+        REQUIRE(EProfiler::get_span_budget("Start"_sc, "End"_sc).overruns == 2);
+        REQUIRE(EProfiler::get_span_budget("Start"_sc, "End"_sc).worst_overrun == 3);
+    }
+
+    SECTION("end_span with explicit budget") {
+        SteadyClock::now(0);
+        EProfiler::set_time("Start"_sc);
+        SteadyClock::now(3);
+        EProfiler::end_span("Start"_sc, "Mid"_sc, 2);
+        SteadyClock::now(4);
+        EProfiler::end_span("Start"_sc, "Mid"_sc, 5);
+
+        REQUIRE(EProfiler::get_span_budget("Start"_sc, "Mid"_sc).overruns == 1);
+        REQUIRE(EProfiler::get_span_budget("Start"_sc, "Mid"_sc).worst_overrun == 1);
+    }
+
+    SECTION("end_span with explicit budget keeps the configured budget") {
+        // Budget of "Start->Mixed" is set to 5 in tests/budgets.json
+        SteadyClock::now(0);
+        EProfiler::set_time("Start"_sc);
+        SteadyClock::now(3);
+        EProfiler::end_span("Start"_sc, "Mixed"_sc, 2);
+
+        REQUIRE(EProfiler::get_span_budget("Start"_sc, "Mixed"_sc).budget == 5);
+        REQUIRE(EProfiler::get_span_budget("Start"_sc, "Mixed"_sc).overruns == 1);
+
+        // Configured budget is still used by end_span without a budget
+        SteadyClock::now(4);
+        EProfiler::end_span("Start"_sc, "Mixed"_sc);
+
+        REQUIRE(EProfiler::get_span_budget("Start"_sc, "Mixed"_sc).overruns == 1);
+
+        SteadyClock::now(7);
+        EProfiler::end_span("Start"_sc, "Mixed"_sc);
+
+        REQUIRE(EProfiler::get_span_budget("Start"_sc, "Mixed"_sc).budget == 5);
+        REQUIRE(EProfiler::get_span_budget("Start"_sc, "Mixed"_sc).overruns == 2);
+        REQUIRE(EProfiler::get_span_budget("Start"_sc, "Mixed"_sc).worst_overrun == 2);
+    }
+
+    SECTION("end_span without configured budget never overruns") {
+        SteadyClock::now(0);
+        EProfiler::set_time("Start"_sc);
+        SteadyClock::now(1000);
+        EProfiler::end_span("Start"_sc, "Unbudgeted"_sc);
+
+        REQUIRE(EProfiler::get_span_budget("Start"_sc, "Unbudgeted"_sc).overruns == 0);
+    }
+}